@@ -8,74 +8,47 @@ graph (.mp) file.  Produces:
 
 * Component list with business‑oriented descriptions
 * Parameter tables
-* A PNG flow diagram drawn with networkx + matplotlib (pure Python)
+* A PNG flow diagram drawn with networkx + matplotlib (pure Python),
+  laid out left to right in data‑flow order
 * Textual data‑flow description
 
 Dependencies
 ------------
     pip install python-docx networkx matplotlib
 
+Shares helpers with ``newabinitio.py``, which must sit next to this script.
+
 Usage
 -----
     python abinitio_mp_to_docx.py path/to/graph.mp output.docx
 """
 
-import re
+import io
 import sys
-import tempfile
-from pathlib import Path
+from collections import defaultdict
+from typing import BinaryIO, Union
 
 import networkx as nx
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from docx import Document
 from docx.shared import Inches
 
+from newabinitio import (
+    append_paragraphs, components_iter, paragraph_xml, parse_mp, topological_sort,
+)
+
 
 # ---------------------------------------------------------------------------
 # 1. Parse the .mp file
 # ---------------------------------------------------------------------------
 
 def parse_mp_file(file_path: str):
-    """Return dict with graph_name, components, connections"""
-    graph_info = {
-        "graph_name": "",
-        "components": {},
-        "connections": [],
-    }
-    current_component = None
-
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as fh:
-        for raw in fh:
-            line = raw.strip()
-
-            # graph "name"
-            if line.startswith("graph"):
-                m = re.match(r'graph\s+"(.+?)"', line)
-                if m:
-                    graph_info["graph_name"] = m.group(1)
-
-            # component "x" of "type"
-            elif line.startswith("component"):
-                m = re.match(r'component\s+"(.+?)"\s+of\s+"(.+?)"', line)
-                if m:
-                    name, ctype = m.groups()
-                    graph_info["components"][name] = {"type": ctype, "parameters": {}}
-                    current_component = name
-
-            # parameter "p" = "value";
-            elif line.startswith("parameter") and current_component:
-                m = re.match(r'parameter\s+"(.+?)"\s+=\s+"?(.*?)"?;?$', line)
-                if m:
-                    pname, pval = m.groups()
-                    graph_info["components"][current_component]["parameters"][pname] = pval
-
-            # connect "src" to "dst"
-            elif line.startswith("connect"):
-                m = re.match(r'connect\s+"(.+?)"\s+to\s+"(.+?)"', line)
-                if m:
-                    graph_info["connections"].append(m.groups())
-
-    return graph_info
+    """Return dict with graph_name, names/types/params (parallel lists), connections
+
+    The parser itself is shared with newabinitio.py (``parse_mp``).
+    """
+    return parse_mp(file_path)
 
 
 # ---------------------------------------------------------------------------
@@ -102,12 +75,39 @@ def describe_component_type(component_type: str) -> str:
 # 3. Pure‑Python flow diagram with networkx + matplotlib
 # ---------------------------------------------------------------------------
 
-def generate_flow_diagram(graph_info: dict, out_png: str = "flow_diagram.png") -> str:
+def layered_layout(G: nx.DiGraph, dx: float = 1.0, dy: float = 1.0) -> dict:
+    """Left‑to‑right layout: x is a node's depth in the flow, y its slot in that layer.
+
+    Depth is the longest path from a source, taken in topological order, so
+    the whole layout is linear in nodes + edges.
+    """
+    order, out_edges = topological_sort(list(G.nodes), G.edges)
+    depth = dict.fromkeys(order, 0)
+    for n in order:
+        for m in out_edges.get(n, ()):
+            if depth[m] <= depth[n]:
+                depth[m] = depth[n] + 1
+
+    layers = defaultdict(list)
+    for n in order:
+        layers[depth[n]].append(n)
+
+    pos = {}
+    for x, members in layers.items():
+        mid = (len(members) - 1) / 2
+        for slot, n in enumerate(members):
+            pos[n] = (x * dx, (mid - slot) * dy)
+    return pos
+
+
+def generate_flow_diagram(graph_info: dict,
+                          out_png: Union[str, BinaryIO] = "flow_diagram.png"):
+    """Render the graph as a PNG to *out_png*, a path or a binary file object."""
     G = nx.DiGraph()
 
     # nodes
-    for comp_name, details in graph_info["components"].items():
-        label = f"{comp_name}\n[{details['type']}]"
+    for comp_name, ctype, _ in components_iter(graph_info):
+        label = f"{comp_name}\n[{ctype}]"
         G.add_node(comp_name, label=label)
 
     # edges
@@ -115,17 +115,29 @@ def generate_flow_diagram(graph_info: dict, out_png: str = "flow_diagram.png") -
         G.add_edge(src, dst)
 
     # layout
-    pos = nx.spring_layout(G, seed=42)
-
-    plt.figure(figsize=(10, 7))
-    nx.draw_networkx_nodes(G, pos, node_size=2500, node_color="skyblue", edgecolors="black")
-    nx.draw_networkx_edges(G, pos, arrowstyle="->", arrowsize=20, width=1)
+    pos = layered_layout(G)
+
+    # Object-oriented Agg rendering: no pyplot global state to set up or
+    # tear down.  150 dpi is plenty for a 6in-wide picture in Word, and a
+    # zero-margin subplot replaces the tight_layout pass.
+    fig = Figure(figsize=(10, 7), dpi=150)
+    ax = fig.subplots()
+    fig.subplots_adjust(left=0, right=1, bottom=0, top=1)
+    nx.draw_networkx_nodes(G, pos, ax=ax, node_size=2500, node_color="skyblue", edgecolors="black")
+    # Edges between neighbouring layers are drawn straight; any edge that
+    # skips a layer (or points backwards) would run through the nodes in
+    # between, so it is bent around them instead.
+    straight, bent = [], []
+    for u, v in G.edges:
+        (straight if pos[v][0] - pos[u][0] == 1 else bent).append((u, v))
+    nx.draw_networkx_edges(G, pos, edgelist=straight, ax=ax, arrowstyle="->", arrowsize=20, width=1)
+    nx.draw_networkx_edges(G, pos, edgelist=bent, ax=ax, arrowstyle="->", arrowsize=20, width=1,
+                           connectionstyle="arc3,rad=0.3")
     labels = {n: G.nodes[n]["label"] for n in G.nodes}
-    nx.draw_networkx_labels(G, pos, labels, font_size=9, font_family="monospace")
-    plt.axis("off")
-    plt.tight_layout()
-    plt.savefig(out_png, dpi=300)
-    plt.close()
+    nx.draw_networkx_labels(G, pos, labels, ax=ax, font_size=9, font_family="monospace")
+    ax.margins(0.08)
+    ax.set_axis_off()
+    FigureCanvasAgg(fig).print_png(out_png)
     return out_png
 
 
@@ -133,34 +145,45 @@ def generate_flow_diagram(graph_info: dict, out_png: str = "flow_diagram.png") -
 # 4. Build the Word document
 # ---------------------------------------------------------------------------
 
-def create_doc(graph_info: dict, diagram_file: str, output_docx: str):
+def create_doc(graph_info: dict, diagram_file: Union[str, BinaryIO], output_docx: str):
     doc = Document()
+    styles = doc.styles
+    title_id = styles["Title"].style_id
+    h1_id = styles["Heading 1"].style_id
+    h2_id = styles["Heading 2"].style_id
+    bullet_id = styles["List Bullet"].style_id
+
+    # paragraphs are queued as raw <w:p> elements and inserted in batches
+    paras = []
+    add = paras.append
 
     # Title & intro
-    doc.add_heading(f"Ab Initio Business Documentation: {graph_info['graph_name']}", 0)
-    doc.add_paragraph(
+    add(paragraph_xml(f"Ab Initio Business Documentation: {graph_info['graph_name']}", title_id))
+    add(paragraph_xml(
         "This document provides a business‑level and technical overview of the Ab Initio graph, "
         "including component roles, parameters, and end‑to‑end data flow."
-    )
+    ))
 
     # Component section
-    doc.add_heading("Components", level=1)
-    for comp_name, comp in graph_info["components"].items():
-        doc.add_heading(f"{comp_name} ({comp['type']})", level=2)
-        doc.add_paragraph(describe_component_type(comp["type"]))
-        if comp["parameters"]:
-            doc.add_paragraph("Parameters:")
-            for pname, pval in comp["parameters"].items():
-                doc.add_paragraph(f"• {pname}: {pval}", style="List Bullet")
+    add(paragraph_xml("Components", h1_id))
+    for comp_name, ctype, params in components_iter(graph_info):
+        add(paragraph_xml(f"{comp_name} ({ctype})", h2_id))
+        add(paragraph_xml(describe_component_type(ctype)))
+        if params:
+            add(paragraph_xml("Parameters:"))
+            for pname, pval in params.items():
+                add(paragraph_xml(f"• {pname}: {pval}", bullet_id))
 
     # Diagram
-    doc.add_heading("Data Flow Diagram", level=1)
+    add(paragraph_xml("Data Flow Diagram", h1_id))
+    append_paragraphs(doc, paras)
     doc.add_picture(diagram_file, width=Inches(6))
 
     # Detailed flows
-    doc.add_heading("Detailed Connections", level=2)
+    add(paragraph_xml("Detailed Connections", h2_id))
     for src, dst in graph_info["connections"]:
-        doc.add_paragraph(f"• Data flows from {src} → {dst}", style="List Bullet")
+        add(paragraph_xml(f"• Data flows from {src} → {dst}", bullet_id))
+    append_paragraphs(doc, paras)
 
     doc.save(output_docx)
     print(f"Documentation written to: {output_docx}")
@@ -180,10 +203,10 @@ def main(argv=None):
     out_docx = argv[1]
 
     graph = parse_mp_file(mp_path)
-    with tempfile.TemporaryDirectory() as tmp:
-        diagram_path = Path(tmp) / "flow_diagram.png"
-        generate_flow_diagram(graph, out_png=str(diagram_path))
-        create_doc(graph, str(diagram_path), out_docx)
+    # the PNG never touches disk: render into memory and embed from there
+    diagram = io.BytesIO()
+    generate_flow_diagram(graph, out_png=diagram)
+    create_doc(graph, diagram, out_docx)
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -6,13 +6,16 @@ gemini_mp_to_business_doc.py
 Generate business‑oriented documentation from an Ab Initio `.mp` file
 using Google Gemini.  Outputs a `.docx` file with clear plain‑text prose.
 
+The `.mp` parser is shared with ``newabinitio.py``, which must sit next
+to this script.
+
 Usage:
     python gemini_mp_to_business_doc.py graph.mp output.docx
     python gemini_mp_to_business_doc.py graph.mp output.docx --api_key YOUR_KEY
 """
 
 from __future__ import annotations
-import argparse, json, os, re, sys, textwrap
+import argparse, functools, json, os, re, sys, textwrap
 from pathlib import Path
 from typing import Dict, Any
 
@@ -20,35 +23,30 @@ import google.generativeai as genai
 from docx import Document
 from docx.shared import Pt
 
+from newabinitio import iter_mp
+
+try:                        # optional: faster prompt serialisation
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # --------------------------------------------------------------------
 # 1. Parse Ab Initio .mp
 # --------------------------------------------------------------------
+# the .mp scanner is shared with newabinitio.py; only the prompt‑friendly
+# nested shape is built here
 def parse_mp(path: str | Path) -> Dict[str, Any]:
     graph = {"graph_name": "", "components": {}, "connections": []}
-    current = None
-    with Path(path).open(encoding="utf-8", errors="ignore") as fh:
-        for raw in fh:
-            line = raw.strip()
-            if line.startswith("graph"):
-                m = re.match(r'graph\s+"(.+?)"', line)
-                if m:
-                    graph["graph_name"] = m.group(1)
-            elif line.startswith("component"):
-                m = re.match(r'component\s+"(.+?)"\s+of\s+"(.+?)"', line)
-                if m:
-                    name, ctype = m.groups()
-                    graph["components"][name] = {"type": ctype, "parameters": {}}
-                    current = name
-            elif line.startswith("parameter") and current:
-                m = re.match(r'parameter\s+"(.+?)"\s+=\s+"?(.*?)"?;?$', line)
-                if m:
-                    pname, pval = m.groups()
-                    graph["components"][current]["parameters"][pname] = pval
-            elif line.startswith("connect"):
-                m = re.match(r'connect\s+"(.+?)"\s+to\s+"(.+?)"', line)
-                if m:
-                    graph["connections"].append(list(m.groups()))
+    for event in iter_mp(path):
+        kind = event[0]
+        if kind == "component":
+            _, name, ctype, parms = event
+            graph["components"][name] = {"type": ctype, "parameters": parms}
+        elif kind == "connection":
+            graph["connections"].append(list(event[1:]))
+        else:
+            graph["graph_name"] = event[1]
     return graph
 
 
@@ -74,18 +72,43 @@ BEGIN_GRAPH
 END_GRAPH
 """).strip()
 
+def graph_to_json(graph: Dict[str, Any]) -> str:
+    if orjson is not None:
+        return orjson.dumps(graph, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(graph, indent=2)
+
 
 # --------------------------------------------------------------------
 # 3. Strip stray markdown
 # --------------------------------------------------------------------
 _MD_PATTERN = re.compile(r'[*_]{1,2}([^*_]+)[*_]{1,2}|`([^`]+)`')
 def strip_markdown(text: str) -> str:
+    # Gemini is told not to use markdown, so most replies have no markers at
+    # all; three substring scans are far cheaper than running the pattern.
+    if "*" not in text and "_" not in text and "`" not in text:
+        return text
     return _MD_PATTERN.sub(lambda m: m.group(1) or m.group(2) or "", text)
 
 
 # --------------------------------------------------------------------
 # 4. Call Gemini
 # --------------------------------------------------------------------
+_configured_key: str | None = None
+
+@functools.lru_cache(maxsize=4)
+def _cached_model(model_name: str) -> genai.GenerativeModel:
+    # batch runs over many graphs reuse the same model object
+    return genai.GenerativeModel(model_name)
+
+def _get_model(api_key: str, model_name: str) -> genai.GenerativeModel:
+    # genai.configure sets process-wide state, so re-run it whenever the key
+    # changes rather than trusting a model cached under an earlier key
+    global _configured_key
+    if api_key != _configured_key:
+        genai.configure(api_key=api_key)
+        _configured_key = api_key
+    return _cached_model(model_name)
+
 def ask_gemini(graph_dict: Dict[str, Any],
                model_name: str,
                api_key: str | None,
@@ -93,9 +116,8 @@ def ask_gemini(graph_dict: Dict[str, Any],
     api_key = api_key or os.getenv("GEMINI_API_KEY")
     if not api_key:
         sys.exit("❌  GEMINI_API_KEY not provided")
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(model_name)
-    prompt = TEMPLATE.format(graph_json=json.dumps(graph_dict, indent=2))
+    model = _get_model(api_key, model_name)
+    prompt = TEMPLATE.format(graph_json=graph_to_json(graph_dict))
     response = model.generate_content(prompt,
                                       generation_config={"temperature": temperature})
     return response.text
@@ -104,17 +126,26 @@ def ask_gemini(graph_dict: Dict[str, Any],
 # --------------------------------------------------------------------
 # 5. Write plain text to docx
 # --------------------------------------------------------------------
+# one match per line: "num" is set (empty) for "1. ..." lines, "bullet" for
+# "- ..." / "• ..." lines; "body" is the trimmed text to write
+_LINE_CLASSIFIER = re.compile(
+    r'(?:(?P<num>(?=\d+\.\s))|\s*(?P<bullet>[-•])[-•\s]*)?\s*(?P<body>.*?)\s*$'
+)
 def text_to_docx(text: str, out_path: str) -> None:
     doc = Document()
+    number_style = doc.styles['List Number']
+    bullet_style = doc.styles['List Bullet']
     for line in text.splitlines():
-        if not line.strip():
-            doc.add_paragraph()
-        elif re.match(r'^\d+\.\s', line):
-            doc.add_paragraph(line.strip(), style='List Number')
-        elif line.lstrip().startswith(("-", "•")):
-            doc.add_paragraph(line.lstrip("-• ").strip(), style='List Bullet')
+        m = _LINE_CLASSIFIER.match(line)
+        body = m["body"]
+        if m["num"] is not None:
+            doc.add_paragraph(body, style=number_style)
+        elif m["bullet"]:
+            doc.add_paragraph(body, style=bullet_style)
+        elif body:
+            doc.add_paragraph(body)
         else:
-            doc.add_paragraph(line.strip())
+            doc.add_paragraph()
     doc.save(out_path)
     print(f"✓  Written: {out_path}")
 
@@ -21,68 +21,146 @@ Python stdlib only otherwise.
 """
 
 from __future__ import annotations
+import os
 import re
 import sys
 from collections import defaultdict, deque
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Iterator, List, Tuple, Any
 
 from docx import Document
-from docx.shared import Pt
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
 
 
 # ---------------------------------------------------------------------------
 # 1. LOW‑LEVEL .MP PARSER
 # ---------------------------------------------------------------------------
 
+# One match per statement line.  Whitespace is spelled [^\S\n] (any blank but
+# a newline) so that, scanning the whole file with MULTILINE, no match spans
+# lines; _read_mp folds \r\n and bare \r endings to \n beforehand.
+# The pattern is bytes: the file is scanned undecoded (keywords and quoting
+# are ASCII) and only the captured values are decoded.  A parameter value is
+# captured raw to end of line and trimmed by _param_value, which avoids the
+# lazy-match/backtrack cost of spelling the optional quotes in the pattern.
+_RE_LINE = re.compile(
+    rb'^[^\S\n]*(?:graph[^\S\n]+"(?P<gname>.+?)"'
+    rb'|component[^\S\n]+"(?P<cname>.+?)"[^\S\n]+of[^\S\n]+"(?P<ctype>.+?)"'
+    rb'|parameter[^\S\n]+"(?P<pname>.+?)"[^\S\n]+=[^\S\n]+(?P<pval>\S[^\n]*)'
+    rb'|connect[^\S\n]+"(?P<src>.+?)"[^\S\n]+to[^\S\n]+"(?P<dst>.+?)")',
+    re.MULTILINE,
+)
+
+
+def _decode(raw: bytes) -> str:
+    return raw.decode("utf-8", "ignore")
+
+
+def _read_mp(path) -> bytes:
+    # bytes with universal newlines, as text-mode line iteration would see them
+    data = Path(path).read_bytes()
+    if b"\r" in data:
+        data = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return data
+
+
+def _param_value(raw: bytes) -> str:
+    # Same result as the former  "?(.*?)"?;?$  tail: drop trailing blanks,
+    # then at most one ';', one closing and one opening quote.
+    raw = raw.rstrip()
+    if raw.endswith(b";"):
+        raw = raw[:-1]
+    if raw.endswith(b'"'):
+        raw = raw[:-1]
+    if raw.startswith(b'"'):
+        raw = raw[1:]
+    return _decode(raw)
+
+
+def iter_mp(mp_path: str | Path) -> Iterator[Tuple]:
+    """
+    Yield parse events in file order:
+        ("graph", name)
+        ("component", name, type, {param: value})
+        ("connection", src, dst)
+
+    A component is yielded once it is complete, i.e. when the next
+    component starts or the file ends, so consumers can act on it at once
+    without waiting for the whole graph.
+    """
+    data = _read_mp(mp_path)
+    pending = None          # (name, type, params) of the component being read
+
+    for m in _RE_LINE.finditer(data):
+        kind = m.lastgroup
+
+        # parameter "foo" = "bar";
+        if kind == "pval":
+            if pending is not None:
+                pending[2][_decode(m["pname"])] = _param_value(m["pval"])
+
+        # component "comp" of "type"
+        elif kind == "ctype":
+            if pending is not None:
+                yield ("component",) + pending
+            pending = (_decode(m["cname"]), _decode(m["ctype"]), {})
+
+        # connect "A" to "B"
+        elif kind == "dst":
+            yield ("connection", _decode(m["src"]), _decode(m["dst"]))
+
+        # graph "name"
+        else:
+            yield ("graph", _decode(m["gname"]))
+
+    if pending is not None:
+        yield ("component",) + pending
+
+
 def parse_mp(mp_path: str | Path) -> Dict[str, Any]:
     """
     Return a dict with:
         graph_name: str
-        components: { name: {"type": str,
-                             "parameters": {param: value}} }
+        names:       List[str]               – component names, in file order
+        types:       List[str]               – component type, per name
+        params:      List[{param: value}]    – component parameters, per name
         connections: List[Tuple[src, dst]]
+
+    Components are kept as parallel lists rather than a dict of dicts; walk
+    them with ``components_iter``.  A repeated component name overwrites the
+    earlier entry in place (last definition wins, first-seen position).
     """
-    graph = {"graph_name": "", "components": {}, "connections": []}
-    current = None
-
-    with Path(mp_path).open(encoding="utf-8", errors="ignore") as fh:
-        for raw in fh:
-            line = raw.strip()
-
-            # graph "name"
-            if line.startswith("graph"):
-                m = re.match(r'graph\s+"(.+?)"', line)
-                if m:
-                    graph["graph_name"] = m.group(1)
-
-            # component "comp" of "type"
-            elif line.startswith("component"):
-                m = re.match(r'component\s+"(.+?)"\s+of\s+"(.+?)"', line)
-                if m:
-                    name, ctype = m.groups()
-                    graph["components"][name] = {
-                        "type": ctype,
-                        "parameters": {},
-                    }
-                    current = name
-
-            # parameter "foo" = "bar";
-            elif line.startswith("parameter") and current:
-                m = re.match(r'parameter\s+"(.+?)"\s+=\s+"?(.*?)"?;?$', line)
-                if m:
-                    pname, pval = m.groups()
-                    graph["components"][current]["parameters"][pname] = pval
-
-            # connect "A" to "B"
-            elif line.startswith("connect"):
-                m = re.match(r'connect\s+"(.+?)"\s+to\s+"(.+?)"', line)
-                if m:
-                    graph["connections"].append(m.groups())
+    graph = {"graph_name": "", "names": [], "types": [], "params": [], "connections": []}
+    index: Dict[str, int] = {}
+
+    for event in iter_mp(mp_path):
+        kind = event[0]
+        if kind == "component":
+            _, name, ctype, parms = event
+            k = index.get(name)
+            if k is None:
+                index[name] = len(graph["names"])
+                graph["names"].append(name)
+                graph["types"].append(ctype)
+                graph["params"].append(parms)
+            else:
+                graph["types"][k] = ctype
+                graph["params"][k] = parms
+        elif kind == "connection":
+            graph["connections"].append(event[1:])
+        else:
+            graph["graph_name"] = event[1]
 
     return graph
 
 
+def components_iter(graph: Dict[str, Any]):
+    """Yield ``(name, type, parameters)`` for every component, in file order."""
+    return zip(graph["names"], graph["types"], graph["params"])
+
+
 # ---------------------------------------------------------------------------
 # 2. BUSINESS PHRASES & HEURISTICS
 # ---------------------------------------------------------------------------
@@ -114,23 +192,22 @@ PARAM_FRIENDLY = {
     "reject_limit": "Maximum % of bad records allowed",
 }
 
-def describe_component(name: str, meta: Dict[str, Any]) -> str:
+def describe_component(name: str, ctype: str, parms: Dict[str, str]) -> str:
     """
     Convert a component and its parameters into a human description.
     """
-    ctype = meta["type"].lower()
+    ctype = ctype.lower()
     desc = TYPE_DESCRIPTIONS.get(
         ctype,
         "Performs a specialised data‑processing step."
     )
 
     # Simple, heuristic enhancements for common parameters
-    parms = meta["parameters"]
     bits: List[str] = []
     if ctype in ("input_table", "input_file") and "filename" in parms:
-        bits.append(f'It reads **{Path(parms["filename"]).name}**.')
+        bits.append(f'It reads **{os.path.basename(parms["filename"])}**.')
     if ctype in ("output_table", "output_file") and "filename" in parms:
-        bits.append(f'It produces **{Path(parms["filename"]).name}**.')
+        bits.append(f'It produces **{os.path.basename(parms["filename"])}**.')
     if ctype == "filter" and "transform" in parms:
         bits.append("Filtering condition is defined in the `transform` expression.")
     if ctype == "join" and "keys" in parms:
@@ -139,6 +216,7 @@ def describe_component(name: str, meta: Dict[str, Any]) -> str:
     return " ".join([desc] + bits)
 
 
+@lru_cache(maxsize=None)
 def friendly_param(pname: str) -> str:
     return PARAM_FRIENDLY.get(pname.lower(), pname.replace("_", " ").title())
 
@@ -147,68 +225,130 @@ def friendly_param(pname: str) -> str:
 # 3. WORD DOCUMENT GENERATION
 # ---------------------------------------------------------------------------
 
-def add_para(doc: Document, text: str, size: int = 11, bold=False) -> None:
-    p = doc.add_paragraph()
-    run = p.add_run(text)
-    run.bold = bold
-    run.font.size = Pt(size)
+_RUN_SPECIAL = re.compile(r"([\t\n\r])")
+
+
+def paragraph_xml(text: str = "", style_id: str | None = None,
+                  size: int | None = None, bold: bool = False):
+    """
+    Build a detached ``<w:p>`` element holding *text* as a single run.
+
+    This is what ``doc.add_paragraph`` / ``add_run`` produce, minus the
+    python‑docx proxy objects and per‑call style resolution; *style_id* is
+    the style's XML id (``doc.styles[name].style_id``), *size* is in points.
+    As with ``Run.text``, tabs become ``<w:tab/>`` and ``\n`` / ``\r``
+    become line breaks.
+    """
+    p = OxmlElement("w:p")
+    if style_id:
+        ppr = OxmlElement("w:pPr")
+        pstyle = OxmlElement("w:pStyle")
+        pstyle.set(qn("w:val"), style_id)
+        ppr.append(pstyle)
+        p.append(ppr)
+    if not text:
+        return p
+
+    r = OxmlElement("w:r")
+    if bold or size:
+        rpr = OxmlElement("w:rPr")
+        if bold:
+            rpr.append(OxmlElement("w:b"))
+        if size:
+            sz = OxmlElement("w:sz")
+            sz.set(qn("w:val"), str(size * 2))      # half‑points
+            rpr.append(sz)
+        r.append(rpr)
+    for chunk in _RUN_SPECIAL.split(text):
+        if chunk == "\t":
+            r.append(OxmlElement("w:tab"))
+        elif chunk == "\n" or chunk == "\r":
+            r.append(OxmlElement("w:br"))
+        elif chunk:
+            t = OxmlElement("w:t")
+            t.set(qn("xml:space"), "preserve")
+            t.text = chunk
+            r.append(t)
+    p.append(r)
+    return p
+
+
+def append_paragraphs(doc: Document, paras: List[Any]) -> None:
+    """Move the queued *paras* to the end of the body (ahead of sectPr)."""
+    body = doc.element.body
+    sect = body.sectPr
+    at = body.index(sect) if sect is not None else len(body)
+    body[at:at] = paras
+    paras.clear()
 
 
 def build_doc(graph: Dict[str, Any], outfile: str) -> None:
     doc = Document()
+    styles = doc.styles
+    title_id = styles["Title"].style_id
+    h1_id = styles["Heading 1"].style_id
+    h2_id = styles["Heading 2"].style_id
+
+    # All paragraphs are queued as raw XML and inserted in one go at the end.
+    paras: List[Any] = []
+    add = paras.append
+
     title = f"Business Documentation – Ab Initio Graph: {graph['graph_name']}"
-    doc.add_heading(title, 0)
+    add(paragraph_xml(title, title_id))
 
     # High‑level overview
-    add_para(
-        doc,
+    add(paragraph_xml(
         "Purpose\n"
         "-------\n"
         "This document explains, in non‑technical language, what the graph does, how data "
         "moves through it, and what each step contributes to the overall outcome. "
         "It is intended for business analysts, project managers and auditors who "
-        "need to understand logic without diving into code."
-    )
-    doc.add_paragraph()  # blank line
+        "need to understand logic without diving into code.",
+        size=11,
+    ))
+    add(paragraph_xml())  # blank line
 
     # COMPONENTS
-    doc.add_heading("1. Component Overview", level=1)
-    for comp_name, meta in graph["components"].items():
-        doc.add_heading(f"{comp_name}  ({meta['type']})", level=2)
-        add_para(doc, describe_component(comp_name, meta))
+    add(paragraph_xml("1. Component Overview", h1_id))
+    for comp_name, ctype, parms in components_iter(graph):
+        add(paragraph_xml(f"{comp_name}  ({ctype})", h2_id))
+        add(paragraph_xml(describe_component(comp_name, ctype, parms), size=11))
 
-        if meta["parameters"]:
-            add_para(doc, "Key Parameters:", bold=True)
-            for pname, pval in meta["parameters"].items():
-                add_para(doc, f"• {friendly_param(pname)}: {pval}", size=10)
+        if parms:
+            add(paragraph_xml("Key Parameters:", size=11, bold=True))
+            for pname, pval in parms.items():
+                add(paragraph_xml(f"• {friendly_param(pname)}: {pval}", size=10))
 
     # DATA FLOW NARRATIVE
-    doc.add_heading("2. End‑to‑End Data‑Flow Narrative", level=1)
-    ordered = topological_sort(graph["components"].keys(), graph["connections"])
+    add(paragraph_xml("2. End‑to‑End Data‑Flow Narrative", h1_id))
+    names, types, params = graph["names"], graph["types"], graph["params"]
+    index = {n: k for k, n in enumerate(names)}
+    ordered, out_edges = topological_sort(names, graph["connections"])
     for i, comp in enumerate(ordered, 1):
-        add_para(
-            doc,
-            f"{i}. Data enters **{comp}** – {describe_component(comp, graph['components'][comp])}",
-        )
+        k = index[comp]
+        add(paragraph_xml(
+            f"{i}. Data enters **{comp}** – {describe_component(comp, types[k], params[k])}",
+            size=11,
+        ))
         # show immediate targets
-        outs = [dst for src, dst in graph["connections"] if src == comp]
+        outs = out_edges.get(comp)
         if outs:
-            add_para(doc, f"   It passes data to → {', '.join(outs)}.", size=10)
+            add(paragraph_xml(f"   It passes data to → {', '.join(outs)}.", size=10))
 
     # PARAMETERS BY BUSINESS GROUP (optional extra)
-    doc.add_heading("3. Parameter Appendix (alphabetical)", level=1)
-    for comp_name in sorted(graph["components"]):
-        meta = graph["components"][comp_name]
-        if not meta["parameters"]:
+    add(paragraph_xml("3. Parameter Appendix (alphabetical)", h1_id))
+    for k in sorted(range(len(names)), key=names.__getitem__):
+        parms = params[k]
+        if not parms:
             continue
-        doc.add_heading(comp_name, level=2)
-        for pname in sorted(meta["parameters"]):
-            add_para(
-                doc,
-                f"{friendly_param(pname)}: {meta['parameters'][pname]}",
+        add(paragraph_xml(names[k], h2_id))
+        for pname in sorted(parms):
+            add(paragraph_xml(
+                f"{friendly_param(pname)}: {parms[pname]}",
                 size=10,
-            )
+            ))
 
+    append_paragraphs(doc, paras)
     doc.save(outfile)
     print(f"✓  Written: {outfile}")
 
@@ -217,8 +357,11 @@ def build_doc(graph: Dict[str, Any], outfile: str) -> None:
 # 4. SIMPLE TOPOLOGICAL SORT (for narrative order)
 # ---------------------------------------------------------------------------
 
-def topological_sort(nodes, edges) -> List[str]:
-    """Return nodes in dependency order (inputs first)."""
+def topological_sort(nodes, edges) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Return nodes in dependency order (inputs first), together with the
+    ``src -> [dst, ...]`` adjacency map built along the way.
+    """
     out_edges = defaultdict(list)
     indeg = {n: 0 for n in nodes}
     for src, dst in edges:
@@ -235,7 +378,7 @@ def topological_sort(nodes, edges) -> List[str]:
             if indeg[m] == 0:
                 q.append(m)
     # if cycles – fallback to original order
-    return order if len(order) == len(nodes) else list(nodes)
+    return (order if len(order) == len(nodes) else list(nodes)), out_edges
 
 
 # ---------------------------------------------------------------------------